@@ -0,0 +1,97 @@
+"""SQLite-backed cache for LLM extraction responses."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Optional
+
+import orjson
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 30 * 60  # seconds
+
+
+class LLMResponseCache:
+    """Stores raw LLM responses keyed by a hash of the normalized fragment.
+
+    Listing blocks repeat heavily across entry pages (same brand/model
+    grids), so identical fragments are answered from the local store
+    instead of re-issuing the LLM call.
+    """
+
+    def __init__(self, path: Path, ttl: int = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(hash TEXT PRIMARY KEY, response BLOB, ts REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, ts FROM responses WHERE hash = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        response, ts = row
+        if self.ttl and time.time() - ts > self.ttl:
+            logger.debug("Cache entry %s expired", key[:12])
+            return None
+        return json.loads(response)
+
+    def set(self, key: str, value: Any) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (hash, response, ts) VALUES (?, ?, ?)",
+                (key, payload, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def normalize_html(html_fragment: str) -> str:
+    """Canonicalize a fragment so equivalent markup hashes identically."""
+
+    soup = BeautifulSoup(html_fragment, "lxml")
+    for tag in soup(["script", "style"]):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        tag.attrs = dict(sorted(tag.attrs.items()))
+    for text in list(soup.find_all(string=True)):
+        text.replace_with(" ".join(text.split()))
+    return str(soup)
+
+
+def fragment_key(html_fragment: str, namespace: str) -> str:
+    digest = hashlib.blake2b()
+    digest.update(namespace.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_html(html_fragment).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def payload_key(payload: Any) -> str:
+    """Exact-match key for a request payload, independent of dict order."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(b"payload\0")
+    digest.update(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS))
+    return digest.hexdigest()
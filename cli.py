@@ -7,10 +7,13 @@ import logging
 from pathlib import Path
 from typing import Optional
 
+import pandas as pd
+
+from .cache import LLMResponseCache
 from .llm import build_llm_client
-from .stage1 import run_stage1
-from .stage2 import run_stage2
-from .stage3 import run_stage3
+from .stage1 import STAGE1_OUTPUT, run_stage1
+from .stage2 import STAGE2_OUTPUT, run_stage2
+from .stage3 import STAGE3_OUTPUT, run_stage3
 from .state import StateManager
 
 logger = logging.getLogger(__name__)
@@ -56,6 +59,11 @@ def main(argv: Optional[list[str]] = None) -> None:
         default=None,
         help="Optional model identifier for the LLM provider",
     )
+    parser.add_argument(
+        "--export-xlsx",
+        action="store_true",
+        help="Convert the Parquet results to .xlsx after the run",
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -71,10 +79,12 @@ def main(argv: Optional[list[str]] = None) -> None:
     state_path = data_dir / "state.json"
     state_manager = StateManager(state_path)
 
+    llm_cache = LLMResponseCache(data_dir / "llm_cache.sqlite3")
     llm_client = build_llm_client(
         endpoint=args.llm_endpoint,
         api_key=args.llm_api_key,
         model=args.llm_model,
+        cache=llm_cache,
     )
 
     if args.stage in {"1", "all"}:
@@ -96,6 +106,19 @@ def main(argv: Optional[list[str]] = None) -> None:
             llm_client=llm_client,
         )
 
+    if args.export_xlsx:
+        _export_xlsx(data_dir)
+
+
+def _export_xlsx(data_dir: Path) -> None:
+    for name in (STAGE1_OUTPUT, STAGE2_OUTPUT, STAGE3_OUTPUT):
+        path = data_dir / name
+        if not path.exists():
+            continue
+        xlsx_path = path.with_suffix(".xlsx")
+        pd.read_parquet(path).to_excel(xlsx_path, index=False)
+        logger.info("Exported %s to %s", path, xlsx_path)
+
 
 if __name__ == "__main__":  # pragma: no cover - CLI entry point
     main()
@@ -2,19 +2,37 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 from typing import Any, Optional
 from urllib.parse import urljoin
 
+import httpx
 import requests
-from bs4 import BeautifulSoup
+from bs4 import Tag
+from lxml import etree
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache import LLMResponseCache, fragment_key, payload_key
 
 logger = logging.getLogger(__name__)
 
-STAGE1_PROMPT_TEMPLATE = (
+# Markup handed to the clients may be a raw string, a BeautifulSoup tag or an
+# already-parsed lxml element; the latter two avoid a reparse for callers that
+# hold a tree.
+Fragment = str | Tag | lxml_html.HtmlElement
+
+# The static instructions are kept byte-identical across calls (no string
+# interpolation) so provider-side prefix caches apply; only the fragment
+# suffix varies per request.
+STAGE1_PROMPT_PREFIX = (
     "Из этого HTML-фрагмента извлеки данные и сформируй JSON-массив. Формат объекта: {\n"
     '  "brand": "",\n'
     '  "model": "",\n'
@@ -28,27 +46,34 @@ STAGE1_PROMPT_TEMPLATE = (
     "- Если данных нет — вернуть пустой массив [].\n"
     "- Все строки оставить как в исходном тексте (ничего не сокращать и не интерпретировать).\n"
     "- URL должен быть полным.\n"
-    "- Не писать объяснений. В ответе должно быть только содержимое JSON.\n\n"
-    "ФРАГМЕНТ HTML\n\n{fragment}"
+    "- Не писать объяснений. В ответе должно быть только содержимое JSON."
 )
 
-STAGE3_PROMPT_TEMPLATE = (
+STAGE1_PROMPT_SUFFIX = "\n\nФРАГМЕНТ HTML\n\n"
+
+STAGE3_PROMPT_PREFIX = (
     "Из следующего HTML блока выдели HTML с техническими характеристиками,"
     " сохранив исходную разметку. Верни JSON объект вида {\"specs_html\": \"...\"}"
     " без лишнего текста. Если данных нет — верни {\"specs_html\": \"\"}."
-    "\n\nHTML:\n{fragment}"
 )
 
+STAGE3_PROMPT_SUFFIX = "\n\nHTML:\n"
+
 
 class BaseLLMClient(ABC):
-    """Abstract interface for LLM interactions."""
+    """Abstract interface for LLM interactions.
+
+    Fragments may be passed as markup strings or as already-parsed
+    ``bs4.Tag`` / lxml elements so callers that hold a parse tree avoid a
+    reparse.
+    """
 
     @abstractmethod
-    def extract_stage1_data(self, html_fragment: str, base_url: str) -> list[dict[str, Any]]:
+    def extract_stage1_data(self, html_fragment: Fragment, base_url: str) -> list[dict[str, Any]]:
         """Extract structured data for stage 1."""
 
     @abstractmethod
-    def extract_stage3_specs(self, html_fragment: str) -> str:
+    def extract_stage3_specs(self, html_fragment: Fragment) -> str:
         """Extract technical specification HTML for stage 3."""
 
 
@@ -63,30 +88,92 @@ class HTTPClientConfig:
 class HTTPJSONLLMClient(BaseLLMClient):
     """LLM client that sends prompts to an HTTP endpoint and expects JSON responses."""
 
-    def __init__(self, config: HTTPClientConfig):
+    def __init__(self, config: HTTPClientConfig, cache: Optional[LLMResponseCache] = None):
         self.config = config
+        self.cache = cache
 
-    def _post(self, payload: dict[str, Any]) -> Any:
+    def _headers(self) -> dict[str, str]:
         headers = {"Content-Type": "application/json"}
         if self.config.api_key:
             headers["Authorization"] = f"Bearer {self.config.api_key}"
-        response = requests.post(
+        return headers
+
+    def _post(self, payload: dict[str, Any]) -> Any:
+        key = self._payload_cache_key(payload)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        response = _sync_session().post(
             self.config.endpoint,
             json=payload,
             timeout=self.config.timeout,
-            headers=headers,
+            headers=self._headers(),
         )
         response.raise_for_status()
-        return response.json()
+        result = response.json()
+        self._cache_set(key, result)
+        return result
+
+    def _payload_cache_key(self, payload: dict[str, Any]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return payload_key(payload)
 
-    def _build_payload(self, prompt: str) -> dict[str, Any]:
+    def _build_payload(self, prefix: str, suffix: str) -> dict[str, Any]:
+        payload: dict[str, Any] = {}
         if self.config.model:
-            return {"model": self.config.model, "input": prompt}
-        return {"input": prompt}
+            payload["model"] = self.config.model
+        if self.config.model and self.config.model.startswith("claude"):
+            # Anthropic models cache the static instructions server-side.
+            payload["system"] = [
+                {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}
+            ]
+            payload["input"] = suffix
+        else:
+            payload["input"] = prefix + suffix
+        return payload
+
+    def extract_stage1_data(self, html_fragment: Fragment, base_url: str) -> list[dict[str, Any]]:
+        html_fragment = _ensure_markup(html_fragment)
+        key = self._cache_key(html_fragment, "stage1")
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._parse_stage1_response(cached, base_url)
+        payload = self._build_payload(STAGE1_PROMPT_PREFIX, STAGE1_PROMPT_SUFFIX + html_fragment)
+        result = self._post(payload)
+        self._cache_set(key, result)
+        return self._parse_stage1_response(result, base_url)
+
+    def extract_stage3_specs(self, html_fragment: Fragment) -> str:
+        html_fragment = _ensure_markup(html_fragment)
+        key = self._cache_key(html_fragment, "stage3")
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._parse_stage3_response(cached)
+        payload = self._build_payload(STAGE3_PROMPT_PREFIX, STAGE3_PROMPT_SUFFIX + html_fragment)
+        result = self._post(payload)
+        self._cache_set(key, result)
+        return self._parse_stage3_response(result)
+
+    def _cache_key(self, html_fragment: str, namespace: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return fragment_key(html_fragment, namespace)
 
-    def extract_stage1_data(self, html_fragment: str, base_url: str) -> list[dict[str, Any]]:
-        prompt = STAGE1_PROMPT_TEMPLATE.format(fragment=html_fragment)
-        result = self._post(self._build_payload(prompt))
+    def _cache_get(self, key: Optional[str]) -> Any:
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("LLM cache hit for fragment %s", key[:12])
+        return cached
+
+    def _cache_set(self, key: Optional[str], result: Any) -> None:
+        if key is not None:
+            self.cache.set(key, result)
+
+    @staticmethod
+    def _parse_stage1_response(result: Any, base_url: str) -> list[dict[str, Any]]:
         if isinstance(result, dict) and "output" in result:
             result = result["output"]
         if isinstance(result, str):
@@ -98,14 +185,16 @@ class HTTPJSONLLMClient(BaseLLMClient):
             if not isinstance(item, dict):
                 logger.debug("Skipping non-dict item from LLM: %r", item)
                 continue
+            # Copy instead of mutating: the same response object is shared by
+            # cached and single-flight callers, and the raw relative URL must
+            # survive for joins against other base URLs.
             if item.get("url"):
-                item["url"] = _join_url(base_url, item["url"])
+                item = {**item, "url": _join_url(base_url, item["url"])}
             items.append(item)
         return items
 
-    def extract_stage3_specs(self, html_fragment: str) -> str:
-        prompt = STAGE3_PROMPT_TEMPLATE.format(fragment=html_fragment)
-        result = self._post(self._build_payload(prompt))
+    @staticmethod
+    def _parse_stage3_response(result: Any) -> str:
         if isinstance(result, dict):
             if "output" in result:
                 result = result["output"]
@@ -118,62 +207,243 @@ class HTTPJSONLLMClient(BaseLLMClient):
         raise ValueError("Unexpected LLM response format for stage 3")
 
 
+class AsyncHTTPJSONLLMClient(HTTPJSONLLMClient):
+    """HTTP LLM client that dispatches prompts concurrently over httpx."""
+
+    MAX_CONNECTIONS = 64
+    MAX_CONCURRENCY = 32
+
+    def __init__(self, config: HTTPClientConfig, cache: Optional[LLMResponseCache] = None):
+        super().__init__(config, cache=cache)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        # The CLI runs each stage inside its own asyncio.run() loop, while
+        # this client outlives them all. Pooled connections, the semaphore
+        # and in-flight futures are bound to the loop they were created on,
+        # so rebuild them whenever the running loop changes; the previous
+        # loop is already closed at that point, so the old pool can only be
+        # dropped, not closed.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or loop is not self._loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.config.timeout,
+                limits=httpx.Limits(max_connections=self.MAX_CONNECTIONS),
+            )
+            self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+            self._inflight = {}
+            self._loop = loop
+        return self._client
+
+    async def _apost(self, payload: dict[str, Any]) -> Any:
+        self._ensure_client()  # refresh loop-bound state before using _inflight
+        key = self._payload_cache_key(payload)
+        if key is None:
+            return await self._request(payload)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        # Single-flight: concurrent calls for the same payload wait for the
+        # first one instead of firing duplicate requests on a cold cache.
+        existing = self._inflight.get(key)
+        if existing is not None:
+            return await existing
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._request(payload)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # waiters may be gone; mark it retrieved
+            raise
+        else:
+            self._cache_set(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _request(self, payload: dict[str, Any]) -> Any:
+        client = self._ensure_client()
+        async with self._semaphore:
+            response = await client.post(
+                self.config.endpoint,
+                json=payload,
+                headers=self._headers(),
+            )
+        response.raise_for_status()
+        return response.json()
+
+    async def extract_stage1_data(self, html_fragment: Fragment, base_url: str) -> list[dict[str, Any]]:
+        html_fragment = _ensure_markup(html_fragment)
+        key = self._cache_key(html_fragment, "stage1")
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._parse_stage1_response(cached, base_url)
+        payload = self._build_payload(STAGE1_PROMPT_PREFIX, STAGE1_PROMPT_SUFFIX + html_fragment)
+        result = await self._apost(payload)
+        self._cache_set(key, result)
+        return self._parse_stage1_response(result, base_url)
+
+    async def extract_stage3_specs(self, html_fragment: Fragment) -> str:
+        html_fragment = _ensure_markup(html_fragment)
+        key = self._cache_key(html_fragment, "stage3")
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._parse_stage3_response(cached)
+        payload = self._build_payload(STAGE3_PROMPT_PREFIX, STAGE3_PROMPT_SUFFIX + html_fragment)
+        result = await self._apost(payload)
+        self._cache_set(key, result)
+        return self._parse_stage3_response(result)
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+
+_RULE_ITEM_TEMPLATE = {
+    "brand": "",
+    "model": "",
+    "body_code": "",
+    "years": "",
+    "generation": "",
+    "type": "",
+    "url": "",
+    "region": "",
+}
+# Relative to the fragment (and including a div root) so evaluating it on an
+# element that belongs to a larger document stays inside that subtree.
+_XP_RULE_DIVS = etree.XPath("descendant-or-self::div")
+_XP_RULE_FIRST_ANCHOR = etree.XPath("(.//a[@href])[1]")
+_XP_RULE_SPECS = etree.XPath(
+    "(.//*[contains(concat(' ', normalize-space(@class), ' '), ' b-left-side ')])[1]"
+)
+
+
 class RuleBasedLLMClient(BaseLLMClient):
     """Fallback client that approximates the LLM behaviour with deterministic parsing."""
 
-    def extract_stage1_data(self, html_fragment: str, base_url: str) -> list[dict[str, Any]]:
-        soup = BeautifulSoup(html_fragment, "html.parser")
+    def extract_stage1_data(self, html_fragment: Fragment, base_url: str) -> list[dict[str, Any]]:
+        tree = _ensure_tree(html_fragment)
         items: list[dict[str, Any]] = []
-        for block in soup.select("div") or [soup]:
-            anchor = block.find("a", href=True)
-            if not anchor:
+        for block in _XP_RULE_DIVS(tree) or [tree]:
+            anchors = _XP_RULE_FIRST_ANCHOR(block)
+            if not anchors:
                 continue
-            url = _join_url(base_url, anchor["href"])
-            text = anchor.get_text(" ", strip=True)
+            anchor = anchors[0]
+            text = " ".join(anchor.text_content().split())
             if not text:
                 continue
             parts = text.split()
-            brand = parts[0] if parts else ""
-            model = " ".join(parts[1:]) if len(parts) > 1 else ""
             items.append(
                 {
-                    "brand": brand,
-                    "model": model,
-                    "body_code": "",
-                    "years": "",
-                    "generation": "",
-                    "type": "",
-                    "url": url,
-                    "region": "",
+                    **_RULE_ITEM_TEMPLATE,
+                    "brand": parts[0],
+                    "model": " ".join(parts[1:]),
+                    "url": _join_url(base_url, anchor.get("href")),
                 }
             )
         return items
 
-    def extract_stage3_specs(self, html_fragment: str) -> str:
-        soup = BeautifulSoup(html_fragment, "html.parser")
-        specs_container = soup.find(class_="b-left-side")
-        if specs_container is None:
-            specs_container = soup
-        return specs_container.decode()
+    def extract_stage3_specs(self, html_fragment: Fragment) -> str:
+        tree = _ensure_tree(html_fragment)
+        if "b-left-side" in (tree.get("class") or "").split():
+            return etree.tostring(tree, encoding="unicode", method="html")
+        matches = _XP_RULE_SPECS(tree)
+        node = matches[0] if matches else tree
+        return etree.tostring(node, encoding="unicode", method="html")
 
 
 def build_llm_client(
     endpoint: Optional[str],
     api_key: Optional[str],
     model: Optional[str],
+    cache: Optional[LLMResponseCache] = None,
 ) -> BaseLLMClient:
     """Factory that selects the appropriate LLM client implementation."""
 
     if endpoint:
         config = HTTPClientConfig(endpoint=endpoint, api_key=api_key, model=model)
-        logger.info("Using HTTP LLM client with endpoint %s", endpoint)
-        return HTTPJSONLLMClient(config)
+        logger.info("Using async HTTP LLM client with endpoint %s", endpoint)
+        return AsyncHTTPJSONLLMClient(config, cache=cache)
 
     logger.info("Using rule-based fallback LLM client")
     return RuleBasedLLMClient()
 
 
+# Dedicated pool for synchronous clients so their fan-out does not compete
+# with whatever else runs on the loop's default executor.
+_SYNC_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-sync")
+
+
+async def extract_stage1_async(
+    client: BaseLLMClient, html_fragment: Fragment, base_url: str
+) -> list[dict[str, Any]]:
+    """Run stage 1 extraction without blocking the event loop."""
+
+    if isinstance(client, AsyncHTTPJSONLLMClient):
+        return await client.extract_stage1_data(html_fragment, base_url)
+    return await asyncio.get_running_loop().run_in_executor(
+        _SYNC_EXECUTOR, partial(client.extract_stage1_data, html_fragment, base_url)
+    )
+
+
+async def extract_stage3_async(client: BaseLLMClient, html_fragment: Fragment) -> str:
+    """Run stage 3 extraction without blocking the event loop."""
+
+    if isinstance(client, AsyncHTTPJSONLLMClient):
+        return await client.extract_stage3_specs(html_fragment)
+    return await asyncio.get_running_loop().run_in_executor(
+        _SYNC_EXECUTOR, partial(client.extract_stage3_specs, html_fragment)
+    )
+
+
+_SYNC_SESSION: Optional[requests.Session] = None
+
+
+def _sync_session() -> requests.Session:
+    """Shared requests session so sequential LLM calls reuse connections."""
+
+    global _SYNC_SESSION
+    if _SYNC_SESSION is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=Retry(total=3, backoff_factor=0.5),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _SYNC_SESSION = session
+    return _SYNC_SESSION
+
+
+def _ensure_markup(fragment: Fragment) -> str:
+    if isinstance(fragment, Tag):
+        return fragment.decode()
+    if isinstance(fragment, lxml_html.HtmlElement):
+        return etree.tostring(fragment, encoding="unicode", method="html")
+    return fragment
+
+
+def _ensure_tree(fragment: Fragment) -> lxml_html.HtmlElement:
+    if isinstance(fragment, lxml_html.HtmlElement):
+        return fragment
+    if isinstance(fragment, Tag):
+        fragment = fragment.decode()
+    return lxml_html.fromstring(fragment)
+
+
 def _join_url(base_url: str, relative: str) -> str:
     if not relative:
         return relative
+    # Nearly every extracted href is already absolute; skip urljoin's
+    # parse machinery for those.
+    if relative.startswith(("http://", "https://")):
+        return relative
+    if relative.startswith("//"):
+        return "https:" + relative
     return urljoin(base_url.rstrip("/") + "/", relative)
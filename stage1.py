@@ -2,21 +2,36 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Iterable
 
+import aiohttp
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+from lxml import html as lxml_html
 
-from .llm import BaseLLMClient
+from .llm import BaseLLMClient, extract_stage1_async
 from .state import StateManager
 
 logger = logging.getLogger(__name__)
 
 STAGE1_STATE_KEY = "stage1"
-STAGE1_OUTPUT = "stage1_results.xlsx"
+STAGE1_OUTPUT = "stage1_results.parquet"
+FETCH_CONCURRENCY = 32
+FETCH_TIMEOUT = 30
+SAVE_EVERY = 50
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; DromParser/1.0; +https://www.drom.ru/)",
+    "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+    # aiohttp decompresses these transparently; brotli would need the
+    # optional brotli package, so it is not advertised.
+    "Accept-Encoding": "gzip, deflate",
+}
+# Upper bound on a single (decompressed) page body; Drom pages are ~500KB,
+# so anything past this is a pathological response we do not need.
+MAX_FETCH_BYTES = 2 * 1024 * 1024
 STAGE1_COLUMNS = [
     "brand",
     "model",
@@ -28,6 +43,13 @@ STAGE1_COLUMNS = [
     "region",
     "entry_url",
 ]
+_EMPTY_RECORD = {column: "" for column in STAGE1_COLUMNS if column != "entry_url"}
+# Compiled once; matches the listing blocks by class token inside libxml2
+# instead of BeautifulSoup's Python-level class splitting.
+_XP_BLOCKS = etree.XPath(
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' css-18bfsxm ')"
+    " and contains(concat(' ', normalize-space(@class), ' '), ' e1ei9t6a4 ')]"
+)
 
 
 class Stage1Processor:
@@ -42,91 +64,101 @@ class Stage1Processor:
         self.output_path = output_path
         self.state_manager = state_manager
         self.llm_client = llm_client
-        self.dataframe = self._load_existing()
-        self._existing_keys = set(
-            zip(self.dataframe.get("entry_url", []), self.dataframe.get("url", []))
-        )
-
-    def _load_existing(self) -> pd.DataFrame:
-        if self.output_path.exists():
-            df = pd.read_excel(self.output_path)
+        self._rows = self._load_existing()
+        self._existing_keys = {
+            (row.get("entry_url", ""), row.get("url", "")) for row in self._rows
+        }
+
+    def _load_existing(self) -> list[dict[str, Any]]:
+        df = read_results(self.output_path)
+        if df is not None:
             missing = [col for col in STAGE1_COLUMNS if col not in df.columns]
             for col in missing:
                 df[col] = ""
-            return df[STAGE1_COLUMNS]
-        return pd.DataFrame(columns=STAGE1_COLUMNS)
+            return df[STAGE1_COLUMNS].to_dict(orient="records")
+        return []
 
     def save(self) -> None:
-        self.dataframe.to_excel(self.output_path, index=False)
+        df = pd.DataFrame(self._rows, columns=STAGE1_COLUMNS)
+        df.to_parquet(self.output_path, index=False)
         logger.debug("Stage 1 results saved to %s", self.output_path)
 
-    def process(self) -> None:
+    async def process(self) -> None:
         state = self.state_manager.get_stage_state(STAGE1_STATE_KEY)
         entry_index = int(state.get("entry_index", 0))
         block_index = int(state.get("block_index", 0))
+        total = len(self.entry_points)
 
-        for idx in range(entry_index, len(self.entry_points)):
-            entry_url = self.entry_points[idx]
-            try:
-                logger.info("Processing entry %s (%d/%d)", entry_url, idx + 1, len(self.entry_points))
-                html = fetch_html(entry_url)
-                soup = BeautifulSoup(html, "html.parser")
-                blocks = soup.find_all("div", class_="css-18bfsxm e1ei9t6a4")
-                if not blocks:
-                    logger.warning("No blocks found for %s", entry_url)
-                start_block = block_index if idx == entry_index else 0
-                for b_idx in range(start_block, len(blocks)):
-                    block_html = blocks[b_idx].decode()
-                    records = self._extract_records(block_html, entry_url)
-                    self._append_records(records)
-                    self.save()
-                    self.state_manager.update_stage_state(
-                        STAGE1_STATE_KEY,
-                        entry_index=idx,
-                        block_index=b_idx + 1,
+        next_entry = entry_index
+        entries_since_flush = 0
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+        try:
+            async with create_session() as session:
+                for batch_start in range(entry_index, total, FETCH_CONCURRENCY):
+                    batch = self.entry_points[batch_start : batch_start + FETCH_CONCURRENCY]
+                    pages = await asyncio.gather(
+                        *[fetch_html(session, url, semaphore) for url in batch],
+                        return_exceptions=True,
                     )
-                block_index = 0
-                self.state_manager.update_stage_state(
-                    STAGE1_STATE_KEY,
-                    entry_index=idx + 1,
-                    block_index=0,
-                )
-            except Exception as exc:  # pragma: no cover - runtime error reporting
-                logger.exception("Failed to process entry %s: %s", entry_url, exc)
-                break
+                    for offset, (entry_url, html) in enumerate(zip(batch, pages)):
+                        idx = batch_start + offset
+                        if isinstance(html, BaseException):
+                            logger.error("Failed to fetch entry %s: %s", entry_url, html)
+                            return
+                        try:
+                            logger.info("Processing entry %s (%d/%d)", entry_url, idx + 1, total)
+                            tree = lxml_html.fromstring(html)
+                            blocks = _XP_BLOCKS(tree)
+                            if not blocks:
+                                logger.warning("No blocks found for %s", entry_url)
+                            start_block = block_index if idx == entry_index else 0
+                            records = await self._extract_records(blocks[start_block:], entry_url)
+                            self._append_records(records)
+                        except Exception as exc:  # pragma: no cover - runtime error reporting
+                            logger.exception("Failed to process entry %s: %s", entry_url, exc)
+                            return
+                        next_entry = idx + 1
+                        entries_since_flush += 1
+                        if entries_since_flush >= SAVE_EVERY:
+                            self._flush_progress(next_entry)
+                            entries_since_flush = 0
+        finally:
+            if entries_since_flush:
+                self._flush_progress(next_entry)
+
+    def _flush_progress(self, next_entry: int) -> None:
+        self.save()
+        self.state_manager.update_stage_state(
+            STAGE1_STATE_KEY,
+            force=True,
+            entry_index=next_entry,
+            block_index=0,
+        )
 
-    def _extract_records(self, block_html: str, entry_url: str) -> list[dict[str, str]]:
-        try:
-            records = self.llm_client.extract_stage1_data(block_html, entry_url)
-        except Exception as exc:
-            logger.exception("LLM extraction failed, falling back to empty list: %s", exc)
-            records = []
+    async def _extract_records(
+        self, blocks: list[lxml_html.HtmlElement], entry_url: str
+    ) -> list[dict[str, str]]:
+        async def extract(block: lxml_html.HtmlElement) -> list[dict[str, Any]]:
+            try:
+                return await extract_stage1_async(self.llm_client, block, entry_url)
+            except Exception as exc:
+                logger.exception("LLM extraction failed, falling back to empty list: %s", exc)
+                return []
+
+        results = await asyncio.gather(*[extract(block) for block in blocks])
         cleaned: list[dict[str, str]] = []
-        for record in records:
-            record.setdefault("brand", "")
-            record.setdefault("model", "")
-            record.setdefault("body_code", "")
-            record.setdefault("years", "")
-            record.setdefault("generation", "")
-            record.setdefault("type", "")
-            record.setdefault("url", "")
-            record.setdefault("region", "")
-            record["entry_url"] = entry_url
-            cleaned.append(record)
+        for records in results:
+            for record in records:
+                cleaned.append({**_EMPTY_RECORD, **record, "entry_url": entry_url})
         return cleaned
 
     def _append_records(self, records: list[dict[str, str]]) -> None:
-        new_records = []
         for record in records:
             key = (record.get("entry_url", ""), record.get("url", ""))
             if key in self._existing_keys:
                 continue
             self._existing_keys.add(key)
-            new_records.append(record)
-        if not new_records:
-            return
-        df = pd.DataFrame(new_records, columns=STAGE1_COLUMNS)
-        self.dataframe = pd.concat([self.dataframe, df], ignore_index=True)
+            self._rows.append(record)
 
 
 def run_stage1(
@@ -141,19 +173,54 @@ def run_stage1(
         entry_points = [line.strip() for line in fh if line.strip()]
     output_path = data_dir / STAGE1_OUTPUT
     processor = Stage1Processor(entry_points, output_path, state_manager, llm_client)
-    processor.process()
+    asyncio.run(processor.process())
 
 
-def fetch_html(url: str, timeout: int = 30) -> str:
-    logger.debug("Fetching %s", url)
-    response = requests.get(
-        url,
-        timeout=timeout,
-        headers={
-            "User-Agent": "Mozilla/5.0 (compatible; DromParser/1.0; +https://www.drom.ru/)",
-            "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
-        },
+def read_results(path: Path) -> pd.DataFrame | None:
+    """Load a stage output file, falling back to a legacy .xlsx copy."""
+    if path.exists():
+        return pd.read_parquet(path)
+    legacy = path.with_suffix(".xlsx")
+    if legacy.exists():
+        logger.info("Migrating legacy results from %s", legacy)
+        return pd.read_excel(legacy)
+    return None
+
+
+def create_session(timeout: int = FETCH_TIMEOUT) -> aiohttp.ClientSession:
+    """Build a client session shared by all fetches of one stage run."""
+    return aiohttp.ClientSession(
+        headers=FETCH_HEADERS,
+        timeout=aiohttp.ClientTimeout(total=timeout),
     )
-    response.raise_for_status()
-    response.encoding = response.apparent_encoding
-    return response.text
+
+
+async def fetch_html(
+    session: aiohttp.ClientSession,
+    url: str,
+    semaphore: asyncio.Semaphore | None = None,
+) -> str:
+    if semaphore is not None:
+        async with semaphore:
+            return await _fetch_text(session, url)
+    return await _fetch_text(session, url)
+
+
+async def _fetch_text(session: aiohttp.ClientSession, url: str) -> str:
+    logger.debug("Fetching %s", url)
+    async with session.get(url) as response:
+        response.raise_for_status()
+        # Stream the body in chunks and stop at MAX_FETCH_BYTES instead of
+        # materializing an unbounded response in one read.
+        chunks: list[bytes] = []
+        received = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            chunks.append(chunk)
+            received += len(chunk)
+            if received >= MAX_FETCH_BYTES:
+                logger.warning("Truncating %s at %d bytes", url, MAX_FETCH_BYTES)
+                break
+        body = b"".join(chunks)[:MAX_FETCH_BYTES]
+    # Honor the charset declared in Content-Type; otherwise assume UTF-8
+    # instead of letting aiohttp run a full-body charset detection pass.
+    return body.decode(response.charset or "utf-8", errors="replace")
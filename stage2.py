@@ -2,26 +2,44 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 from pathlib import Path
 from typing import Any
 from urllib.parse import urljoin
 
+import orjson
 import pandas as pd
-from bs4 import BeautifulSoup
-
-from .stage1 import fetch_html
+from lxml import etree
+from lxml import html as lxml_html
+
+from .stage1 import (
+    FETCH_CONCURRENCY,
+    SAVE_EVERY,
+    STAGE1_OUTPUT,
+    create_session,
+    fetch_html,
+    read_results,
+)
 from .state import StateManager
 
 logger = logging.getLogger(__name__)
 
 STAGE2_STATE_KEY = "stage2"
-STAGE2_OUTPUT = "stage2_results.xlsx"
+STAGE2_OUTPUT = "stage2_results.parquet"
 IMAGE_MAIN_CLASS = "b-image b-image_type_centred-image b-image_theme_cat-resp-main"
 IMAGE_THUMB_CLASS = "b-line__thumb b-image"
 COMPLETION_ROW_CLASS = "y7l57t2"
 
+# Compiled once at import; class-name scans via BeautifulSoup walk the whole
+# tree in Python, while these run inside libxml2.
+_XP_MAIN_IMAGE = etree.XPath(f"//a[@class='{IMAGE_MAIN_CLASS}'][@href]/@href")
+_XP_THUMB_IMAGES = etree.XPath(f"//a[@class='{IMAGE_THUMB_CLASS}'][@href]/@href")
+_XP_CONFIG_ROWS = etree.XPath(
+    f"//tr[contains(concat(' ', normalize-space(@class), ' '), ' {COMPLETION_ROW_CLASS} ')]"
+)
+_XP_CONFIG_LINK = etree.XPath("./td[2]//a[@href]")
+
 
 class Stage2Processor:
     def __init__(self, base_df: pd.DataFrame, output_path: Path, state_manager: StateManager) -> None:
@@ -29,14 +47,20 @@ class Stage2Processor:
         self.output_path = output_path
         self.state_manager = state_manager
         self.dataframe = self._load_existing()
+        # Column lists for the hot loop; .iloc builds a Series per row.
+        if "url" in self.dataframe.columns:
+            self._urls = ["" if pd.isna(url) else url for url in self.dataframe["url"]]
+        else:
+            self._urls = [""] * len(self.dataframe)
+        self._main_images = self.dataframe["main_image_url"].tolist()
+        self._image_urls = self.dataframe["image_urls"].tolist()
+        self._configurations = self.dataframe["configurations"].tolist()
 
     def _load_existing(self) -> pd.DataFrame:
         df = self.base_df.copy()
-        if self.output_path.exists():
-            existing = pd.read_excel(self.output_path)
+        existing = read_results(self.output_path)
+        if existing is not None:
             existing = existing.reindex(range(len(existing)))
-        else:
-            existing = None
         for column, default in (
             ("main_image_url", ""),
             ("image_urls", "[]"),
@@ -50,68 +74,95 @@ class Stage2Processor:
         return df
 
     def save(self) -> None:
-        self.dataframe.to_excel(self.output_path, index=False)
+        self.dataframe["main_image_url"] = self._main_images
+        self.dataframe["image_urls"] = self._image_urls
+        self.dataframe["configurations"] = self._configurations
+        self.dataframe.to_parquet(self.output_path, index=False)
         logger.debug("Stage 2 results saved to %s", self.output_path)
 
-    def process(self) -> None:
+    async def process(self) -> None:
         state = self.state_manager.get_stage_state(STAGE2_STATE_KEY)
         row_index = int(state.get("row_index", 0))
         total_rows = len(self.dataframe)
-        for idx in range(row_index, total_rows):
-            row = self.dataframe.iloc[idx]
-            url = row.get("url")
-            if not url:
-                logger.warning("Row %d has no URL, skipping", idx)
-                continue
-            try:
-                logger.info("Stage 2: processing %s (%d/%d)", url, idx + 1, total_rows)
-                html = fetch_html(url)
-                soup = BeautifulSoup(html, "html.parser")
-                main_image = extract_main_image(soup, base_url=url)
-                thumb_images = extract_additional_images(soup, base_url=url)
-                configurations = extract_configurations(soup, base_url=url)
-                self.dataframe.at[idx, "main_image_url"] = main_image or ""
-                self.dataframe.at[idx, "image_urls"] = json.dumps(thumb_images, ensure_ascii=False)
-                self.dataframe.at[idx, "configurations"] = json.dumps(configurations, ensure_ascii=False)
-                self.save()
-                self.state_manager.update_stage_state(STAGE2_STATE_KEY, row_index=idx + 1)
-            except Exception as exc:  # pragma: no cover - runtime error reporting
-                logger.exception("Failed to process %s: %s", url, exc)
-                break
+        next_row = row_index
+        rows_since_flush = 0
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+        try:
+            async with create_session() as session:
+                for batch_start in range(row_index, total_rows, FETCH_CONCURRENCY):
+                    batch_rows = range(batch_start, min(batch_start + FETCH_CONCURRENCY, total_rows))
+                    urls = self._urls[batch_rows.start : batch_rows.stop]
+                    tasks = {
+                        idx: fetch_html(session, url, semaphore)
+                        for idx, url in zip(batch_rows, urls)
+                        if url
+                    }
+                    pages = dict(
+                        zip(tasks, await asyncio.gather(*tasks.values(), return_exceptions=True))
+                    )
+                    for idx, url in zip(batch_rows, urls):
+                        if not url:
+                            logger.warning("Row %d has no URL, skipping", idx)
+                            next_row = idx + 1
+                            continue
+                        html = pages[idx]
+                        if isinstance(html, BaseException):
+                            logger.error("Failed to process %s: %s", url, html)
+                            return
+                        try:
+                            logger.info("Stage 2: processing %s (%d/%d)", url, idx + 1, total_rows)
+                            tree = lxml_html.fromstring(html)
+                            main_image = extract_main_image(tree, base_url=url)
+                            thumb_images = extract_additional_images(tree, base_url=url)
+                            configurations = extract_configurations(tree, base_url=url)
+                            self._main_images[idx] = main_image or ""
+                            self._image_urls[idx] = orjson.dumps(thumb_images).decode()
+                            self._configurations[idx] = orjson.dumps(configurations).decode()
+                        except Exception as exc:  # pragma: no cover - runtime error reporting
+                            logger.exception("Failed to process %s: %s", url, exc)
+                            return
+                        next_row = idx + 1
+                        rows_since_flush += 1
+                        if rows_since_flush >= SAVE_EVERY:
+                            self._flush_progress(next_row)
+                            rows_since_flush = 0
+        finally:
+            if rows_since_flush:
+                self._flush_progress(next_row)
+
+    def _flush_progress(self, next_row: int) -> None:
+        self.save()
+        self.state_manager.update_stage_state(STAGE2_STATE_KEY, force=True, row_index=next_row)
 
 
 def run_stage2(data_dir: Path, state_manager: StateManager) -> None:
-    stage1_path = data_dir / "stage1_results.xlsx"
-    if not stage1_path.exists():
+    base_df = read_results(data_dir / STAGE1_OUTPUT)
+    if base_df is None:
         raise FileNotFoundError("Stage 1 results not found. Run stage 1 first.")
-    base_df = pd.read_excel(stage1_path)
     output_path = data_dir / STAGE2_OUTPUT
     processor = Stage2Processor(base_df, output_path, state_manager)
-    processor.process()
+    asyncio.run(processor.process())
 
 
-def extract_main_image(soup: BeautifulSoup, base_url: str) -> str | None:
-    anchor = soup.find("a", class_=IMAGE_MAIN_CLASS, href=True)
-    if anchor is None:
+def extract_main_image(tree: lxml_html.HtmlElement, base_url: str) -> str | None:
+    hrefs = _XP_MAIN_IMAGE(tree)
+    if not hrefs:
         return None
-    return urljoin(base_url, anchor["href"])
+    return urljoin(base_url, hrefs[0])
 
 
-def extract_additional_images(soup: BeautifulSoup, base_url: str) -> list[str]:
-    anchors = soup.find_all("a", class_=IMAGE_THUMB_CLASS, href=True)
-    return [urljoin(base_url, anchor["href"]) for anchor in anchors]
+def extract_additional_images(tree: lxml_html.HtmlElement, base_url: str) -> list[str]:
+    return [urljoin(base_url, href) for href in _XP_THUMB_IMAGES(tree)]
 
 
-def extract_configurations(soup: BeautifulSoup, base_url: str) -> list[dict[str, Any]]:
+def extract_configurations(tree: lxml_html.HtmlElement, base_url: str) -> list[dict[str, Any]]:
     configurations: list[dict[str, Any]] = []
-    for row in soup.find_all("tr", class_=COMPLETION_ROW_CLASS):
-        cells = row.find_all("td")
-        if len(cells) < 2:
-            continue
-        link = cells[1].find("a", href=True)
-        if not link:
+    for row in _XP_CONFIG_ROWS(tree):
+        links = _XP_CONFIG_LINK(row)
+        if not links:
             continue
-        name = link.get_text(strip=True)
-        href = urljoin(base_url, link["href"])
+        link = links[0]
+        name = link.text_content().strip()
+        href = urljoin(base_url, link.get("href"))
         configurations.append({"name": name, "url": href})
     return configurations
@@ -2,22 +2,31 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 from pathlib import Path
 from typing import Any
 
+import aiohttp
+import orjson
 import pandas as pd
 from bs4 import BeautifulSoup
 
-from .llm import BaseLLMClient
-from .stage1 import fetch_html
+from .llm import BaseLLMClient, extract_stage3_async
+from .stage1 import (
+    FETCH_CONCURRENCY,
+    SAVE_EVERY,
+    create_session,
+    fetch_html,
+    read_results,
+)
+from .stage2 import STAGE2_OUTPUT
 from .state import StateManager
 
 logger = logging.getLogger(__name__)
 
 STAGE3_STATE_KEY = "stage3"
-STAGE3_OUTPUT = "stage3_results.xlsx"
+STAGE3_OUTPUT = "stage3_results.parquet"
 
 
 class Stage3Processor:
@@ -33,14 +42,20 @@ class Stage3Processor:
         self.state_manager = state_manager
         self.llm_client = llm_client
         self.dataframe = self._load_existing()
+        # Column lists for the hot loop; .iloc builds a Series per row.
+        if "configurations" in self.dataframe.columns:
+            self._raw_configurations = [
+                "[]" if pd.isna(raw) else raw for raw in self.dataframe["configurations"]
+            ]
+        else:
+            self._raw_configurations = ["[]"] * len(self.dataframe)
+        self._specs = self.dataframe["configuration_specs"].tolist()
 
     def _load_existing(self) -> pd.DataFrame:
         df = self.base_df.copy()
-        if self.output_path.exists():
-            existing = pd.read_excel(self.output_path)
+        existing = read_results(self.output_path)
+        if existing is not None:
             existing = existing.reindex(range(len(existing)))
-        else:
-            existing = None
         if existing is not None and "configuration_specs" in existing.columns:
             df["configuration_specs"] = existing["configuration_specs"].reindex(
                 df.index, fill_value="[]"
@@ -50,55 +65,81 @@ class Stage3Processor:
         return df
 
     def save(self) -> None:
-        self.dataframe.to_excel(self.output_path, index=False)
+        self.dataframe["configuration_specs"] = self._specs
+        self.dataframe.to_parquet(self.output_path, index=False)
         logger.debug("Stage 3 results saved to %s", self.output_path)
 
-    def process(self) -> None:
+    async def process(self) -> None:
         state = self.state_manager.get_stage_state(STAGE3_STATE_KEY)
         row_index = int(state.get("row_index", 0))
         total_rows = len(self.dataframe)
-        for idx in range(row_index, total_rows):
-            row = self.dataframe.iloc[idx]
-            configurations_raw = row.get("configurations") or "[]"
-            try:
-                configurations: list[dict[str, Any]] = json.loads(configurations_raw)
-            except json.JSONDecodeError:
-                logger.warning("Row %d has invalid configurations JSON, skipping", idx)
-                configurations = []
-            if not configurations:
-                logger.info("Stage 3: no configurations for row %d", idx)
-                self.dataframe.at[idx, "configuration_specs"] = json.dumps([], ensure_ascii=False)
-                self.save()
-                self.state_manager.update_stage_state(STAGE3_STATE_KEY, row_index=idx + 1)
-                continue
-            try:
-                logger.info("Stage 3: processing row %d/%d", idx + 1, total_rows)
-                specs = self._fetch_specs(configurations)
-                self.dataframe.at[idx, "configuration_specs"] = json.dumps(specs, ensure_ascii=False)
-                self.save()
-                self.state_manager.update_stage_state(STAGE3_STATE_KEY, row_index=idx + 1)
-            except Exception as exc:  # pragma: no cover - runtime error reporting
-                logger.exception("Failed to process row %d: %s", idx, exc)
-                break
-
-    def _fetch_specs(self, configurations: list[dict[str, Any]]) -> list[dict[str, Any]]:
-        results: list[dict[str, Any]] = []
-        for config in configurations:
-            url = config.get("url")
-            name = config.get("name", "")
-            if not url:
-                continue
-            try:
-                html = fetch_html(url)
-                soup = BeautifulSoup(html, "html.parser")
-                target = soup.select_one("body div.b-left-side")
-                fragment = target.decode() if target is not None else soup.body.decode() if soup.body else html
-                specs_html = self.llm_client.extract_stage3_specs(fragment)
-                results.append({"name": name, "url": url, "specs_html": specs_html})
-            except Exception as exc:
-                logger.exception("Failed to extract specs for %s: %s", url, exc)
-                results.append({"name": name, "url": url, "specs_html": ""})
-        return results
+        next_row = row_index
+        rows_since_flush = 0
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+        try:
+            async with create_session() as session:
+                for idx in range(row_index, total_rows):
+                    configurations_raw = self._raw_configurations[idx] or "[]"
+                    try:
+                        configurations: list[dict[str, Any]] = orjson.loads(configurations_raw)
+                    except orjson.JSONDecodeError:
+                        logger.warning("Row %d has invalid configurations JSON, skipping", idx)
+                        configurations = []
+                    if not configurations:
+                        logger.info("Stage 3: no configurations for row %d", idx)
+                        self._specs[idx] = orjson.dumps([]).decode()
+                    else:
+                        try:
+                            logger.info("Stage 3: processing row %d/%d", idx + 1, total_rows)
+                            specs = await self._fetch_specs(session, semaphore, configurations)
+                            self._specs[idx] = orjson.dumps(specs).decode()
+                        except Exception as exc:  # pragma: no cover - runtime error reporting
+                            logger.exception("Failed to process row %d: %s", idx, exc)
+                            break
+                    next_row = idx + 1
+                    rows_since_flush += 1
+                    if rows_since_flush >= SAVE_EVERY:
+                        self._flush_progress(next_row)
+                        rows_since_flush = 0
+        finally:
+            if rows_since_flush:
+                self._flush_progress(next_row)
+
+    def _flush_progress(self, next_row: int) -> None:
+        self.save()
+        self.state_manager.update_stage_state(STAGE3_STATE_KEY, force=True, row_index=next_row)
+
+    async def _fetch_specs(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        configurations: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        results = await asyncio.gather(
+            *[self._fetch_spec(session, semaphore, config) for config in configurations]
+        )
+        return [result for result in results if result is not None]
+
+    async def _fetch_spec(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        config: dict[str, Any],
+    ) -> dict[str, Any] | None:
+        url = config.get("url")
+        name = config.get("name", "")
+        if not url:
+            return None
+        try:
+            html = await fetch_html(session, url, semaphore)
+            soup = BeautifulSoup(html, "lxml")
+            target = soup.select_one("body div.b-left-side")
+            fragment = target if target is not None else soup.body if soup.body else html
+            specs_html = await extract_stage3_async(self.llm_client, fragment)
+            return {"name": name, "url": url, "specs_html": specs_html}
+        except Exception as exc:
+            logger.exception("Failed to extract specs for %s: %s", url, exc)
+            return {"name": name, "url": url, "specs_html": ""}
 
 
 def run_stage3(
@@ -106,10 +147,9 @@ def run_stage3(
     state_manager: StateManager,
     llm_client: BaseLLMClient,
 ) -> None:
-    stage2_path = data_dir / "stage2_results.xlsx"
-    if not stage2_path.exists():
+    base_df = read_results(data_dir / STAGE2_OUTPUT)
+    if base_df is None:
         raise FileNotFoundError("Stage 2 results not found. Run stage 2 first.")
-    base_df = pd.read_excel(stage2_path)
     output_path = data_dir / STAGE3_OUTPUT
     processor = Stage3Processor(base_df, output_path, state_manager, llm_client)
-    processor.process()
+    asyncio.run(processor.process())
@@ -2,22 +2,34 @@
 
 from __future__ import annotations
 
-import json
 import logging
+import time
 from pathlib import Path
 from threading import Lock
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
+FLUSH_INTERVAL = 1.0  # seconds between unforced disk writes
+
 
 class StateManager:
-    """Simple JSON-backed state store."""
+    """Simple JSON-backed state store.
+
+    Updates land in memory immediately; disk writes are rate-limited to
+    one per FLUSH_INTERVAL unless forced, and skipped entirely when the
+    serialized state has not changed.
+    """
 
     def __init__(self, path: Path):
         self.path = path
         self._lock = Lock()
         self._data: Dict[str, Any] = {}
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._last_payload: Optional[bytes] = None
         self._load()
 
     def _load(self) -> None:
@@ -25,29 +37,38 @@ class StateManager:
             logger.debug("State file %s does not exist, starting fresh", self.path)
             return
         try:
-            with self.path.open("r", encoding="utf-8") as fh:
-                self._data = json.load(fh)
+            payload = self.path.read_bytes()
+            self._data = orjson.loads(payload)
+            self._last_payload = orjson.dumps(self._data, option=orjson.OPT_INDENT_2)
             logger.debug("Loaded state from %s: %s", self.path, self._data)
         except Exception as exc:  # pragma: no cover - defensive
             logger.warning("Failed to read state file %s: %s", self.path, exc)
             self._data = {}
 
     def _flush(self) -> None:
+        payload = orjson.dumps(self._data, option=orjson.OPT_INDENT_2)
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        if payload == self._last_payload:
+            logger.debug("State unchanged, skipping write to %s", self.path)
+            return
         self.path.parent.mkdir(parents=True, exist_ok=True)
         tmp_path = self.path.with_suffix(".tmp")
-        with tmp_path.open("w", encoding="utf-8") as fh:
-            json.dump(self._data, fh, ensure_ascii=False, indent=2)
+        tmp_path.write_bytes(payload)
         tmp_path.replace(self.path)
+        self._last_payload = payload
         logger.debug("State written to %s", self.path)
 
     def get_stage_state(self, stage: str) -> dict[str, Any]:
         return dict(self._data.get(stage, {}))
 
-    def update_stage_state(self, stage: str, **updates: Any) -> None:
+    def update_stage_state(self, stage: str, force: bool = False, **updates: Any) -> None:
         with self._lock:
             stage_state = self._data.setdefault(stage, {})
             stage_state.update(updates)
-            self._flush()
+            self._dirty = True
+            if force or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush()
 
     def reset_stage(self, stage: str) -> None:
         with self._lock:
@@ -55,5 +76,12 @@ class StateManager:
                 del self._data[stage]
                 self._flush()
 
+    def flush(self) -> None:
+        """Write any pending state to disk immediately."""
+
+        with self._lock:
+            if self._dirty:
+                self._flush()
+
     def snapshot(self) -> dict[str, Any]:
         return dict(self._data)